@@ -224,6 +224,7 @@ def init(site: str, sites_path: str = ".", new_site: bool = False, force=False)
 	local.new_doc_templates = {}
 
 	local.jenv = None
+	local.jenv_by_lang = {}
 	local.jloader = None
 	local.cache = {}
 	local.form_dict = _dict()
@@ -580,6 +581,7 @@ def set_user(username: str):
 	local.cache = {}
 	local.form_dict = _dict()
 	local.jenv = None
+	local.jenv_by_lang = {}
 	local.session.data = _dict()
 	local.role_permissions = {}
 	local.new_doc_templates = {}
@@ -129,7 +129,7 @@ def clear_doctype_cache(doctype=None):
 def _clear_doctype_cache_from_redis(doctype: str | None = None):
 	from frappe.desk.notifications import delete_notification_count_for
 
-	for key in ("is_table", "doctype_modules"):
+	for key in ("is_table", "doctype_modules", "translated_doctypes"):
 		frappe.cache.delete_value(key)
 
 	def clear_single(dt):
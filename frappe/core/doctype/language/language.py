@@ -31,8 +31,14 @@ class Language(Document):
 		validate_with_regex(new, "Name")
 
 	def on_update(self):
-		frappe.cache.delete_value("languages_with_name")
-		frappe.cache.delete_value("languages")
+		clear_languages_cache()
+
+	def on_trash(self):
+		clear_languages_cache()
+
+
+def clear_languages_cache():
+	frappe.cache.delete_value(["languages_with_name", "languages"])
 
 
 def validate_with_regex(name, label):
@@ -1,9 +1,11 @@
 # Copyright (c) 2015, Frappe Technologies and Contributors
 # License: MIT. See LICENSE
+import json
+
 import frappe
 from frappe import _
 from frappe.tests.utils import FrappeTestCase
-from frappe.translate import clear_cache
+from frappe.translate import clear_cache, update_translations_for_source
 
 
 class TestTranslation(FrappeTestCase):
@@ -84,6 +86,45 @@ class TestTranslation(FrappeTestCase):
 
 		self.assertTrue(_(source), target)
 
+	def test_update_translations_for_source(self):
+		source = "Test Update Translations"
+		updated = create_translation("de", [source, "Alte Übersetzung"])
+		removed = create_translation("fr", [source, "Ancienne traduction"])
+
+		# load the user translations into the cache before updating them
+		self.assertEqual(_(source, lang="de"), "Alte Übersetzung")
+		self.assertEqual(_(source, lang="fr"), "Ancienne traduction")
+		self.assertEqual(_(source, lang="es"), source)
+
+		translations = {"de": "Neue Übersetzung", "es": "Traducción"}
+		update_translations_for_source(source, json.dumps(translations))
+
+		self.assertEqual(
+			frappe.db.get_value("Translation", updated.name, "translated_text"), "Neue Übersetzung"
+		)
+		self.assertFalse(frappe.db.exists("Translation", removed.name))
+		self.assertEqual(
+			frappe.get_all(
+				"Translation", {"source_text": source, "language": "es"}, pluck="translated_text"
+			),
+			["Traducción"],
+		)
+
+		self.assertEqual(_(source, lang="de"), "Neue Übersetzung")
+		self.assertEqual(_(source, lang="fr"), source)
+		self.assertEqual(_(source, lang="es"), "Traducción")
+
+		# new translations are still validated as documents
+		self.assertRaises(
+			frappe.MandatoryError, update_translations_for_source, source, json.dumps({"it": ""})
+		)
+		self.assertRaises(
+			frappe.LinkValidationError,
+			update_translations_for_source,
+			source,
+			json.dumps({"_Test Unknown Language": "Text"}),
+		)
+
 
 def get_translation_data():
 	html_source_data = """<font color="#848484" face="arial, tahoma, verdana, sans-serif">
@@ -0,0 +1,315 @@
+# Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
+# License: MIT. See LICENSE
+import os
+import pickle
+import tempfile
+from unittest.mock import patch
+
+from babel.messages.catalog import Catalog
+from babel.messages.extract import extract_from_dir
+from babel.messages.mofile import write_mo
+
+import frappe
+import frappe.translate
+from frappe.tests.utils import FrappeTestCase
+from frappe.translate import (
+	deduplicate_messages,
+	extract_messages_from_custom_fields,
+	extract_messages_from_dir,
+	extract_messages_from_doctype,
+	extract_messages_from_doctypes,
+	extract_messages_from_workflow,
+	get_doctype_messages,
+	load_mo_catalog,
+	parse_mo_file,
+	print_language,
+)
+
+
+class TestMessageCatalog(FrappeTestCase):
+	"""Message extraction and the MO catalogs written by `frappe.translate`"""
+
+	def test_deduplicate_messages(self):
+		messages = [
+			("DocType: Note", "Title"),
+			(None, "Content"),
+			("Workflow: Approval", "Title", 3),
+		]
+		self.assertEqual(
+			deduplicate_messages(messages), [("DocType: Note", "Title"), (None, "Content")]
+		)
+
+	def test_parse_mo_file(self):
+		catalog = Catalog(locale="de")
+		catalog.add("Change", "Wechsel")
+		catalog.add("Change", "Wechselgeld", context="Coins")
+		catalog.add("Untranslated")
+
+		with tempfile.NamedTemporaryFile(suffix=".mo") as mo_file:
+			write_mo(mo_file, catalog)
+			mo_file.flush()
+
+			self.assertEqual(
+				parse_mo_file(mo_file.name),
+				{"Change": "Wechsel", "Coins\x04Change": "Wechselgeld"},
+			)
+
+	def test_load_mo_catalog(self):
+		catalog = Catalog(locale="de")
+		catalog.add("Change", "Wechsel")
+
+		with tempfile.TemporaryDirectory() as dirname:
+			mo_file = os.path.join(dirname, "messages.mo")
+			with open(mo_file, "wb") as f:
+				write_mo(f, catalog)
+
+			stat = os.stat(mo_file)
+			with open(os.path.join(dirname, "messages.catalog.pickle"), "wb") as f:
+				pickle.dump((stat.st_size, stat.st_mtime_ns, {"Change": "Pickled"}), f)
+
+			self.assertEqual(load_mo_catalog(mo_file), {"Change": "Pickled"})
+
+			# a MO file copied with an older modification time
+			os.utime(mo_file, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+			self.assertEqual(load_mo_catalog(mo_file), {"Change": "Wechsel"})
+
+	def test_extract_messages_from_dir(self):
+		method_map = [
+			("**.py", "frappe.translate.babel_extract_python"),
+			("**.js", "frappe.translate.babel_extract_javascript"),
+		]
+
+		def directory_filter(dirpath):
+			return not os.path.basename(dirpath).startswith("_")
+
+		with tempfile.TemporaryDirectory() as dirname:
+			files = {
+				"module.py": '_("Python Message")\n_("Message with context", context="Test")\n',
+				"public/script.js": '__("JS Message");\n',
+				"public/nested/other.js": 'const x = 1;\n__("Nested Message");\n',
+				"_ignored/skipped.py": '_("Skipped Message")\n',
+				"notes.txt": '_("Not Extracted")\n',
+			}
+			for path, content in files.items():
+				os.makedirs(os.path.dirname(os.path.join(dirname, path)), exist_ok=True)
+				with open(os.path.join(dirname, path), "w") as f:
+					f.write(content)
+
+			messages = list(extract_messages_from_dir(dirname, method_map, directory_filter))
+			expected = extract_from_dir(dirname, method_map, directory_filter=directory_filter)
+			self.assertEqual(messages, list(expected))
+			self.assertEqual(
+				{message[2] for message in messages},
+				{"Python Message", "Message with context", "JS Message", "Nested Message"},
+			)
+
+	def test_extract_messages_from_custom_fields(self):
+		from frappe.custom.doctype.custom_field.custom_field import create_custom_field
+
+		name = "Note-test_translated_select"
+		frappe.delete_doc_if_exists("Custom Field", name)
+		create_custom_field(
+			"Note",
+			{
+				"fieldname": "test_translated_select",
+				"label": "Test Translated Select",
+				"description": "Pick a test option",
+				"fieldtype": "Select",
+				"options": "\nFirst Option\nSecond Option",
+			},
+		)
+		self.addCleanup(frappe.delete_doc_if_exists, "Custom Field", name)
+
+		expected = [
+			(f"Custom Field - label: {name}", "Test Translated Select"),
+			(f"Custom Field - description: {name}", "Pick a test option"),
+			(f"Custom Field - options: {name}", "First Option"),
+			(f"Custom Field - options: {name}", "Second Option"),
+		]
+
+		for fixtures in (
+			[{"dt": "Custom Field", "filters": {"name": name}}],
+			[{"doctype": "Custom Field", "filters": [["name", "in", [name]]]}],
+			["Custom Field"],
+		):
+			with patch("frappe.translate.get_app_fixtures", return_value=fixtures):
+				messages = extract_messages_from_custom_fields("frappe")
+
+			self.assertEqual([m for m in messages if m[0].endswith(f": {name}")], expected)
+
+	def test_extract_messages_from_workflow_fixtures(self):
+		from frappe.workflow.doctype.workflow.test_workflow import create_todo_workflow
+
+		first = create_todo_workflow().name
+		second = create_test_workflow("_Test Translate Workflow")
+		self.addCleanup(frappe.delete_doc_if_exists, "Workflow", first)
+		self.addCleanup(frappe.delete_doc_if_exists, "Workflow", second)
+
+		def get_workflows(fixtures):
+			with patch("frappe.translate.get_app_fixtures", return_value=fixtures):
+				messages = extract_messages_from_workflow(app_name="frappe")
+
+			return {
+				context.removeprefix("Workflow: ")
+				for context, message in messages
+				if context in (f"Workflow: {first}", f"Workflow: {second}")
+			}
+
+		first_fixture = {"dt": "Workflow", "filters": {"name": first}}
+		second_fixture = {
+			"doctype": "Workflow",
+			"filters": [["workflow_name", "like", "_Test Translate%"]],
+		}
+
+		self.assertEqual(get_workflows([first_fixture]), {first})
+		self.assertEqual(get_workflows([second_fixture]), {second})
+		self.assertEqual(get_workflows([first_fixture, second_fixture]), {first, second})
+		self.assertEqual(get_workflows([first_fixture, "Workflow"]), {first, second})
+		missing_fixture = {"dt": "Workflow", "filters": {"name": "_Test Missing Workflow"}}
+		self.assertEqual(get_workflows([missing_fixture]), set())
+
+		self.assertIn(
+			(f"Workflow: {first}", "Pending"), extract_messages_from_workflow(doctype="ToDo")
+		)
+
+	def test_extract_messages_from_doctypes(self):
+		names = ["DocType", "Role", "Note", "ToDo"]
+
+		expected, customizations = set(), set()
+		for name in names:
+			expected.update(extract_messages_from_doctype(name))
+
+			# meta includes custom fields, the batched extraction only reads standard fields
+			meta = frappe.get_meta(name)
+			custom_fields = [df for df in meta.fields if df.get("is_custom_field")]
+			customizations.update(get_doctype_messages(name, None, None, custom_fields, []))
+			customizations.discard((f"DocType: {name}", name))
+
+		self.assertEqual(
+			set(extract_messages_from_doctypes(names)) - customizations, expected - customizations
+		)
+		self.assertEqual(extract_messages_from_doctypes([]), [])
+
+	def test_print_language_restores_on_error(self):
+		lang, jenv = frappe.local.lang, frappe.local.jenv
+
+		with self.assertRaises(ZeroDivisionError):
+			with print_language("de"):
+				self.assertEqual(frappe.local.lang, "de")
+				1 / 0
+
+		self.assertEqual(frappe.local.lang, lang)
+		self.assertIs(frappe.local.jenv, jenv)
+
+
+class TestMergedCatalogTranslation(FrappeTestCase):
+	"""`frappe.translate.f`, which reads the merged MO catalogs of all apps"""
+
+	def setUp(self):
+		tmpdir = tempfile.TemporaryDirectory()
+		self.addCleanup(tmpdir.cleanup)
+		self.root = tmpdir.name
+
+		write_test_mo(
+			self.root,
+			"first_app",
+			"es",
+			{
+				"Change": "Cambio",
+				("Coins", "Change"): "Cambio (monedas)",
+				("Identity", "Change"): "Change",
+				"Save": "Guardar",
+			},
+		)
+		write_test_mo(self.root, "first_app", "es_GT", {"Change": "Cambio GT"})
+		write_test_mo(self.root, "second_app", "es", {"Save": "Salvar", "Delete": "Borrar"})
+
+		locale_paths = [
+			(app, os.path.join(self.root, app, "locale")) for app in ("first_app", "second_app")
+		]
+		patcher = patch("frappe.translate.get_locale_paths", return_value=locale_paths)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		frappe.translate.clear_process_cache()
+		self.addCleanup(frappe.translate.clear_process_cache)
+
+	def test_translation(self):
+		self.assertEqual(frappe.translate.f("Change", lang="es"), "Cambio")
+		self.assertEqual(frappe.translate.f("Not Translated", lang="es"), "Not Translated")
+
+	def test_translation_with_context(self):
+		self.assertEqual(frappe.translate.f("Change", "Coins", "es"), "Cambio (monedas)")
+		# falls back to the message without context
+		self.assertEqual(frappe.translate.f("Change", "Unknown", "es"), "Cambio")
+		# a translation equal to its source is still a hit
+		self.assertEqual(frappe.translate.f("Change", "Identity", "es"), "Change")
+
+	def test_translation_precedence(self):
+		# apps installed first win
+		self.assertEqual(frappe.translate.f("Save", lang="es"), "Guardar")
+		self.assertEqual(frappe.translate.f("Delete", lang="es"), "Borrar")
+		# specific locales win over their parent language
+		self.assertEqual(frappe.translate.f("Change", lang="es-GT"), "Cambio GT")
+		self.assertEqual(frappe.translate.f("Save", lang="es-GT"), "Guardar")
+
+	def test_preload_language(self):
+		frappe.translate.preload_language("es-GT")
+		self.assertEqual(frappe.translate.get_merged_catalog.cache_info().currsize, 1)
+
+		self.assertEqual(frappe.translate.f("Change", lang="es-GT"), "Cambio GT")
+		self.assertEqual(frappe.translate.get_merged_catalog.cache_info().hits, 1)
+
+	def test_clear_process_cache(self):
+		self.assertEqual(frappe.translate.f("Change", lang="es"), "Cambio")
+
+		write_test_mo(self.root, "first_app", "es", {"Change": "Modificar"})
+		self.assertEqual(frappe.translate.f("Change", lang="es"), "Cambio")
+
+		frappe.translate.clear_process_cache()
+		self.assertEqual(frappe.translate.f("Change", lang="es"), "Modificar")
+
+	def test_reload_changed_mo_files(self):
+		self.assertEqual(frappe.translate.f("Change", lang="es"), "Cambio")
+
+		# compiled by another process
+		write_test_mo(self.root, "first_app", "es", {"Change": "Modificar"})
+		locale_dir = os.path.join(self.root, "first_app", "locale", "es", "LC_MESSAGES")
+		mo_file = os.path.join(locale_dir, "messages.mo")
+		os.utime(mo_file, ns=(0, os.stat(mo_file).st_mtime_ns + 10**9))
+
+		with patch("frappe.translate.MO_CHECK_INTERVAL", 0):
+			self.assertEqual(frappe.translate.f("Change", lang="es"), "Modificar")
+
+
+def write_test_mo(root, app, locale, messages):
+	"""Writes `messages`, keyed by message or `(context, message)`, as the MO file of
+	`locale` in a dummy app directory under `root`"""
+	catalog = Catalog(locale=locale)
+	for key, string in messages.items():
+		context, message = key if isinstance(key, tuple) else (None, key)
+		catalog.add(message, string, context=context)
+
+	locale_dir = os.path.join(root, app, "locale", locale, "LC_MESSAGES")
+	os.makedirs(locale_dir, exist_ok=True)
+	with open(os.path.join(locale_dir, "messages.mo"), "wb") as f:
+		write_mo(f, catalog)
+
+
+def create_test_workflow(name):
+	"""Inactive workflow on ToDo, which already gets a `workflow_state` field from
+	`create_todo_workflow`"""
+	frappe.delete_doc_if_exists("Workflow", name)
+	workflow = frappe.new_doc("Workflow")
+	workflow.workflow_name = name
+	workflow.document_type = "ToDo"
+	workflow.workflow_state_field = "workflow_state"
+	workflow.is_active = 0
+	workflow.append("states", dict(state="Pending", allow_edit="All"))
+	workflow.append("states", dict(state="Approved", allow_edit="All"))
+	workflow.append(
+		"transitions",
+		dict(state="Pending", action="Approve", next_state="Approved", allowed="All"),
+	)
+	workflow.insert(ignore_permissions=True)
+	return workflow.name
@@ -11,29 +11,46 @@
 import csv
 import functools
 import gettext
-import itertools
 import json
-import operator
+import mmap
+import multiprocessing
 import os
+import pickle
 import re
+import string
+import struct
+import sys
+import time
 
 from collections import defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager, suppress
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
 
 from pypika.terms import PseudoColumn
 
 from babel.messages.catalog import Catalog
-from babel.messages.extract import extract_from_dir, extract_python
-from babel.messages.mofile import read_mo, write_mo
+from babel.messages.extract import check_and_call_extract_file, extract_python
+from babel.messages.mofile import write_mo
 from babel.messages.pofile import read_po, write_po
 from babel.messages.extract import DEFAULT_KEYWORDS
+from babel.util import pathmatch
+
+try:
+	# faster parsing of the JSON files read by the babel extractors
+	from orjson import loads as json_loads
+except ImportError:
+	json_loads = json.loads
 
 import frappe
+from frappe import as_unicode
 from frappe.model.utils import InvalidIncludePath, render_include
-from frappe.query_builder import DocType, Field
-from frappe.utils import is_html, strip_html_tags, unique
+from frappe.query_builder import Criterion, DocType, Field
+from frappe.utils import is_html, make_filter_tuple, strip_html_tags
+from frappe.utils.caching import site_cache
 
 TRANSLATE_PATTERN = re.compile(
 	r"_\(\s*"  # starts with literal `_(`, ignore following whitespace/newlines
@@ -61,14 +78,22 @@ TRANSLATE_PATTERN = re.compile(
 )
 REPORT_TRANSLATE_PATTERN = re.compile('"([^:,^"]*):')
 CSV_STRIP_WHITESPACE_PATTERN = re.compile(r"{\s?([0-9]+)\s?}")
+ASCII_LETTERS = frozenset(string.ascii_letters)
 
 DEFAULT_LANG = "en"
 LOCALE_DIR = "locale"
 MERGED_TRANSLATION_KEY = "merged_translations"
+MO_CATALOG_SUFFIX = ".catalog.pickle"
+# seconds between checks for MO files changed by another process, see `check_mo_files`
+MO_CHECK_INTERVAL = 10
 POT_FILE = "main.pot"
 TRANSLATION_DOMAIN = "messages"
 USER_TRANSLATION_KEY = "lang_user_translations"
 
+# modification times of the MO files read into the merged catalogs of this process
+_mo_file_mtimes: dict[str, int] = {}
+_mo_files_checked_at = 0.0
+
 
 def get_language(lang_list: list = None) -> str:
 	"""Set `frappe.local.lang` from HTTP headers at beginning of request
@@ -172,6 +197,7 @@ def get_lang_dict():
 	)
 
 
+@functools.lru_cache(maxsize=1024)
 def get_translator(lang: str, localedir: str | None = LOCALE_DIR, context: bool | None = False):
 	t = gettext.translation(TRANSLATION_DOMAIN, localedir=localedir, languages=(lang,), fallback=True)
 
@@ -181,6 +207,117 @@ def get_translator(lang: str, localedir: str | None = LOCALE_DIR, context: bool
 	return t.gettext
 
 
+@functools.lru_cache(maxsize=1)
+def get_locale_paths() -> list[tuple[str, str]]:
+	"""Returns `(app, locale_path)` for all installed apps, in app install order"""
+	return [
+		(app, f"{frappe.get_app_path(app)}{os.sep}{LOCALE_DIR}")
+		for app in frappe.get_all_apps(with_internal_apps=True)
+	]
+
+
+# catalogs are loaded lazily per language, only a few stay resident in a worker
+@functools.lru_cache(maxsize=4)
+def get_merged_catalog(lang: str) -> dict[str, str]:
+	"""Returns the `.mo` catalogs of all apps for a language merged into a single dict.
+
+	Messages with a context are keyed as `context\x04message`, same as in `gettext`.
+	Apps installed first and specific locales (es_GT over es) take precedence.
+	"""
+	catalog = {}
+
+	for app, locale_path in reversed(get_locale_paths()):
+		for mo_file in reversed(find_mo_files(locale_path, lang)):
+			with suppress(OSError):
+				_mo_file_mtimes[mo_file] = os.stat(mo_file).st_mtime_ns
+			catalog.update(load_mo_catalog(mo_file))
+
+	# metadata of the MO file is stored against an empty msgid
+	catalog.pop("", None)
+
+	# same messages are shipped by many apps, keep a single copy of each string
+	intern = sys.intern
+	return {
+		intern(k) if isinstance(k, str) else k: intern(v) if isinstance(v, str) else v
+		for k, v in catalog.items()
+	}
+
+
+@functools.lru_cache(maxsize=None)
+def find_mo_files(locale_path: str, lang: str) -> tuple[str, ...]:
+	"""Returns the MO files of `lang` in `locale_path`, most specific locale first.
+
+	Memoized so that apps without translations for a language, which get an empty
+	result, aren't looked up on disk again when a merged catalog is rebuilt.
+	"""
+	return tuple(gettext.find(TRANSLATION_DOMAIN, locale_path, (lang,), True))
+
+
+def preload_language(lang: str) -> None:
+	"""Load the merged catalog of `lang` ahead of the first translation in it"""
+	get_merged_catalog((lang or DEFAULT_LANG).replace("-", "_"))
+
+
+def parse_mo_file(mo_file: str | os.PathLike[str]) -> dict[str, str]:
+	"""Returns the messages of a MO file as a dict, keyed like `gettext` does.
+
+	The file is memory mapped and read straight into the dict, without building a
+	`gettext.GNUTranslations` object. The MO header (charset, plural forms) is
+	skipped, messages are expected to be UTF-8 encoded, as written by Babel.
+	"""
+	catalog = {}
+
+	with open(mo_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+		(magic,) = struct.unpack_from("<I", buf)
+		if magic == gettext.GNUTranslations.LE_MAGIC:
+			byte_order = "<"
+		elif magic == gettext.GNUTranslations.BE_MAGIC:
+			byte_order = ">"
+		else:
+			raise OSError(0, "Bad magic number", str(mo_file))
+
+		msgcount, masteridx, transidx = struct.unpack_from(f"{byte_order}3I", buf, 8)
+		entry = struct.Struct(f"{byte_order}II")
+
+		for i in range(0, msgcount * 8, 8):
+			mlen, moff = entry.unpack_from(buf, masteridx + i)
+			if not mlen:
+				# header
+				continue
+
+			tlen, toff = entry.unpack_from(buf, transidx + i)
+			msg = buf[moff : moff + mlen]
+			tmsg = buf[toff : toff + tlen]
+
+			if b"\x00" in msg:
+				msgid = msg.split(b"\x00")[0].decode()
+				for n, plural in enumerate(tmsg.split(b"\x00")):
+					catalog[(msgid, n)] = plural.decode()
+			else:
+				catalog[msg.decode()] = tmsg.decode()
+
+	return catalog
+
+
+def load_mo_catalog(mo_file: str) -> dict[str, str]:
+	"""Returns the messages of a MO file as a dict.
+
+	Reads the pickled copy written by `write_binary` when it was made from a MO file
+	of the same size and modification time, instead of parsing the MO file again.
+	"""
+	catalog_file = os.path.splitext(mo_file)[0] + MO_CATALOG_SUFFIX
+
+	with suppress(OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+		with open(catalog_file, "rb") as f:
+			size, mtime, catalog = pickle.load(f)
+
+		stat = os.stat(mo_file)
+		if (size, mtime) == (stat.st_size, stat.st_mtime_ns):
+			return catalog
+
+	return parse_mo_file(mo_file)
+
+
 def new_catalog(app: str, locale: str | None = None) -> Catalog:
 	def get_hook(hook, app):
 		return frappe.get_hooks(hook, [None], app)[0]
@@ -227,15 +364,20 @@ def get_catalog(app: str, locale: str | None = None) -> Catalog:
 		return read_po(f)
 
 
-def write_catalog(app: str, catalog: Catalog, locale: str | None = None) -> Path:
-	"""Writes a catalog to the given app and locale"""
+def write_catalog(
+	app: str, catalog: Catalog, locale: str | None = None, sort: bool = True
+) -> Path:
+	"""Writes a catalog to the given app and locale
+
+	:param sort: Sort messages before writing. Can be skipped when the catalog is already in order.
+	"""
 	po_path = get_po_path(app, locale) if locale else get_pot_path(app)
 
 	if not po_path.parent.exists():
 		po_path.parent.mkdir(parents=True)
 
 	with open(po_path, "wb") as f:
-		write_po(f, catalog, sort_output=True, ignore_obsolete=True)
+		write_po(f, catalog, sort_output=sort, ignore_obsolete=True)
 
 	return po_path
 
@@ -246,6 +388,15 @@ def write_binary(app: str, catalog: Catalog, locale: str) -> Path:
 	with open(mo_path, "wb") as mo_file:
 		write_mo(mo_file, catalog)
 
+	# pre-parsed copy of the MO catalog, only valid for this exact MO file, see `load_mo_catalog`
+	stat = mo_path.stat()
+	with open(mo_path.with_suffix(MO_CATALOG_SUFFIX), "wb") as catalog_file:
+		pickle.dump(
+			(stat.st_size, stat.st_mtime_ns, parse_mo_file(mo_path)),
+			catalog_file,
+			protocol=pickle.HIGHEST_PROTOCOL,
+		)
+
 	return mo_path
 
 
@@ -286,7 +437,7 @@ def generate_pot(target_app: str | None = None):
 
 		method_map.extend(get_extra_include_js_files(app))
 
-		for filename, lineno, message, comments, context in extract_from_dir(
+		for filename, lineno, message, comments, context in extract_messages_from_dir(
 			app_path, method_map, directory_filter=directory_filter
 		):
 			if not message:
@@ -305,8 +456,7 @@ def generate_pot(target_app: str | None = None):
 			filtered_doctypes = (
 				frappe.qb.from_("DocType").where(Field("module").isin(modules)).select("name").run(pluck=True)
 			)
-			for name in filtered_doctypes:
-				messages.extend(extract_messages_from_doctype(name))
+			messages.extend(extract_messages_from_doctypes(filtered_doctypes))
 
 			# reports
 			report = DocType("Report")
@@ -318,12 +468,7 @@ def generate_pot(target_app: str | None = None):
 				.select(report.name)
 				.run(pluck=True)
 			)
-			for name in names:
-				messages.append((None, name))
-				messages.extend(extract_messages_from_report(name))
-				for i in messages:
-					if not isinstance(i, tuple):
-						raise Exception
+			messages.extend(extract_messages_from_reports(names))
 
 		# workflow based on app.hooks.fixtures
 		messages.extend(extract_messages_from_workflow(app_name=app))
@@ -357,6 +502,56 @@ def generate_pot(target_app: str | None = None):
 		print(f"POT file created at {pot_path}")
 
 
+def extract_messages_from_dir(
+	dirname: str, method_map: list[tuple[str, str]], directory_filter=None
+) -> Iterator[tuple[str, int, str | tuple, list[str], str | None]]:
+	"""
+	Same as babel's `extract_from_dir`, but files are extracted in parallel by a pool
+	of worker processes. Results are yielded in the same (sorted) order by the parent.
+	"""
+	absname = os.path.abspath(dirname)
+	filepaths = []
+
+	for root, dirnames, filenames in os.walk(absname):
+		dirnames[:] = sorted(
+			subdir
+			for subdir in dirnames
+			if not directory_filter or directory_filter(os.path.join(root, subdir))
+		)
+
+		for filename in sorted(filenames):
+			filepath = os.path.join(root, filename).replace(os.sep, "/")
+			relpath = os.path.relpath(filepath, absname)
+			if any(pathmatch(pattern, relpath) for pattern, method in method_map):
+				filepaths.append(filepath)
+
+	if not filepaths:
+		return
+
+	extract = functools.partial(
+		_extract_messages_from_file, dirname=absname, method_map=method_map
+	)
+
+	# extractors use `frappe.local`, which workers only inherit from a forked parent
+	if "fork" not in multiprocessing.get_all_start_methods():
+		for filepath in filepaths:
+			yield from extract(filepath)
+		return
+
+	with ProcessPoolExecutor(mp_context=multiprocessing.get_context("fork")) as executor:
+		for messages in executor.map(extract, filepaths, chunksize=16):
+			yield from messages
+
+
+def _extract_messages_from_file(filepath: str, dirname: str, method_map: list[tuple[str, str]]):
+	# runs in a worker process, so results are materialized to be sent back
+	return list(
+		check_and_call_extract_file(
+			filepath, method_map, {}, None, DEFAULT_KEYWORDS, (), False, dirpath=dirname
+		)
+	)
+
+
 def new_po(locale, target_app: str | None = None):
 	apps = [target_app] if target_app else frappe.get_all_apps(with_internal_apps=True)
 
@@ -390,6 +585,9 @@ def compile(target_app: str | None = None, locale: str | None = None):
 				print(f"Failed to create a MO file for {locale} in app {app}")
 				continue
 
+	# drop translations loaded from the previous MO files
+	clear_process_cache()
+
 
 def update_po(target_app: str | None = None, locale: str | None = None):
 	"""
@@ -406,7 +604,8 @@ def update_po(target_app: str | None = None, locale: str | None = None):
 		for locale in locales:
 			po_catalog = get_catalog(app, locale)
 			po_catalog.update(pot_catalog)
-			po_path = write_catalog(app, po_catalog, locale)
+			# `update` follows the order of the POT file, which is written sorted
+			po_path = write_catalog(app, po_catalog, locale, sort=False)
 			print(f"PO file modified at {po_path}")
 
 
@@ -431,9 +630,10 @@ def csv_to_po(app: str, locale: str):
 		return
 
 	catalog: Catalog = get_catalog(app)
-	msgid_context_map = defaultdict(list)
-	for message in catalog:
-		msgid_context_map[message.id].append(message.context)
+	messages = {(message.id, message.context): message for message in catalog}
+	messages_by_id = defaultdict(list)
+	for (msgid, _context), message in messages.items():
+		messages_by_id[msgid].append(message)
 
 	with open(csv_file) as f:
 		for row in csv.reader(f):
@@ -446,56 +646,73 @@ def csv_to_po(app: str, locale: str):
 
 			if not msgctxt:
 				# if old context is not defined, add msgstr to all contexts
-				for context in msgid_context_map.get(msgid, []):
-					if message := catalog.get(msgid, context):
-						message.string = msgstr
-			elif message := catalog.get(msgid, msgctxt):
+				for message in messages_by_id.get(msgid, ()):
+					message.string = msgstr
+			elif message := messages.get((msgid, msgctxt)):
 				message.string = msgstr
 
 	po_path = write_catalog(app, catalog, locale)
 	print(f"PO file created at {po_path}")
 
 
-def f(msg: str, context: str = None, lang: str = DEFAULT_LANG) -> str:
+def f(msg: str, context: str | None = None, lang: str | None = None) -> str:
 	"""
 	Method to translate a string
 
 	:param msg: Key to translate
 	:param context: Translation context
-	:param lang: Language to fetch
+	:param lang: Language to fetch, defaults to `DEFAULT_LANG`
 	:return: Translated string. Could be original string
+
+	Translations are memoized in this process. MO files compiled by another process
+	are picked up within `MO_CHECK_INTERVAL` seconds, new apps and languages only
+	after `clear_cache` or a restart.
 	"""
-	from frappe import as_unicode
-	from frappe.utils import is_html, strip_html_tags
+	check_mo_files()
+	# resolved before the memoized call so that `None`, "" and "en" share cache entries
+	return _f(msg, context, lang or DEFAULT_LANG)
 
-	if not lang:
-		lang = DEFAULT_LANG
 
-	msg = as_unicode(msg).strip()
+def check_mo_files():
+	"""Clears the translations memoized by this process when a MO file they were read
+	from has changed since, e.g. after `bench compile` in another process"""
+	global _mo_files_checked_at
 
-	if is_html(msg):
-		msg = strip_html_tags(msg)
+	now = time.monotonic()
+	if now - _mo_files_checked_at < MO_CHECK_INTERVAL:
+		return
+
+	_mo_files_checked_at = now
+	for mo_file, mtime in list(_mo_file_mtimes.items()):
+		try:
+			changed = os.stat(mo_file).st_mtime_ns != mtime
+		except OSError:
+			changed = True
 
-	apps = frappe.get_all_apps(with_internal_apps=True)
+		if changed:
+			clear_process_cache()
+			return
 
-	for app in apps:
-		app_path = frappe.get_app_path(app)
-		locale_path = os.path.join(app_path, LOCALE_DIR)
-		has_context = context is not None
 
-		if has_context:
-			t = get_translator(lang.replace("-", "_"), localedir=locale_path, context=has_context)
-			r = t(context, msg)
-			if r != msg:
-				return r
+@functools.lru_cache(maxsize=20000)
+def _f(msg: str, context: str | None, lang: str) -> str:
+	msg = msg.strip() if type(msg) is str else as_unicode(msg).strip()
 
-		t = get_translator(lang.replace("-", "_"), localedir=locale_path, context=False)
-		r = t(msg)
+	# skip the regex for plain text messages
+	if "<" in msg and is_html(msg):
+		msg = strip_html_tags(msg)
+
+	# looked up through the bounded merged catalog cache on every miss of `_f`, so
+	# that no reference keeps an evicted catalog alive
+	catalog = get_merged_catalog(lang.replace("-", "_"))
 
-		if r != msg:
-			return r
+	if context is not None:
+		# same key as `gettext.pgettext` uses for contextual messages
+		translation = catalog.get(f"{context}\x04{msg}")
+		if translation is not None:
+			return translation
 
-	return msg
+	return catalog.get(msg, msg)
 
 
 def get_messages_for_boot():
@@ -503,7 +720,9 @@ def get_messages_for_boot():
 	Return all message translations that are required on boot
 	"""
 	messages = get_all_translations(frappe.local.lang)
-	messages.update(get_dict_from_hooks("boot", None))
+	if boot_messages := get_dict_from_hooks("boot", None):
+		# `get_all_translations` returns the dict held in the local cache
+		messages = {**messages, **boot_messages}
 
 	return messages
 
@@ -603,10 +822,12 @@ def get_translations_from_apps(lang, apps=None):
 		mo_files = gettext.find(TRANSLATION_DOMAIN, localedir, (lang.replace("-", "_"),), True)
 
 		for file in mo_files:
-			with open(file, "rb") as f:
-				po = read_mo(f)
-				for m in po:
-					translations[m.id] = m.string
+			# keyed by message only, contextual messages are stored as `context\x04message`
+			translations.update(
+				(msgid.rpartition("\x04")[2], msgstr)
+				for msgid, msgstr in load_mo_catalog(file).items()
+				if isinstance(msgid, str)
+			)
 
 	return translations
 
@@ -642,36 +863,50 @@ def get_user_translations(lang: str) -> dict[str, str]:
 
 def clear_cache():
 	"""Clear all translation assets from :meth:`frappe.cache`"""
-	frappe.cache.delete_key("langinfo")
+	# a single DEL, also clears translations saved in boot cache
+	frappe.cache.delete_value(
+		[
+			"langinfo",
+			"bootinfo",
+			"translation_assets",
+			USER_TRANSLATION_KEY,
+			MERGED_TRANSLATION_KEY,
+		]
+	)
 
-	# clear translations saved in boot cache
-	frappe.cache.delete_key("bootinfo")
-	frappe.cache.delete_key("translation_assets")
-	frappe.cache.delete_key(USER_TRANSLATION_KEY)
-	frappe.cache.delete_key(MERGED_TRANSLATION_KEY)
+	clear_process_cache()
 
 
+def clear_process_cache():
+	"""Clear translations parsed from `.mo` files and other translation data held in
+	memory by this process"""
+	get_locale_paths.cache_clear()
+	find_mo_files.cache_clear()
+	get_translator.cache_clear()
+	get_merged_catalog.cache_clear()
+	_f.cache_clear()
+	_mo_file_mtimes.clear()
+	get_app_fixtures.cache_clear()
+
+
+@functools.lru_cache(maxsize=4096)
 def is_translatable(m):
-	if (
-		re.search("[a-zA-Z]", m)
-		and not m.startswith("fa fa-")
+	# cheap string checks first, the same messages repeat across doctypes
+	return bool(
+		not m.startswith(("fa fa-", "eval:"))
 		and not m.endswith("px")
-		and not m.startswith("eval:")
-	):
-		return True
-	return False
+		and not ASCII_LETTERS.isdisjoint(m)
+	)
 
 
 def add_line_number(messages, code):
 	ret = []
 	messages = sorted(messages, key=lambda x: x[0])
-	newlines = [m.start() for m in re.compile(r"\n").finditer(code)]
 	lineno = 1
-	newline_i = 0
+	last_pos = 0
 	for pos, message, context in messages:
-		while newline_i < len(newlines) and pos > newlines[newline_i]:
-			lineno += 1
-			newline_i += 1
+		lineno += code.count("\n", last_pos, pos)
+		last_pos = pos
 		ret.append([lineno, "gettext", message, [context if context != None else ""]])
 	return ret
 
@@ -685,10 +920,12 @@ def send_translations(translation_dict):
 
 
 def deduplicate_messages(messages):
-	ret = []
-	op = operator.itemgetter(1)
-	messages = sorted(messages, key=op)
-	return [next(g) for k, g in itertools.groupby(messages, op)]
+	"""Keep the first occurrence of every message, in the order they were found"""
+	unique_messages = {}
+	for m in messages:
+		unique_messages.setdefault(m[1], m)
+
+	return list(unique_messages.values())
 
 
 def escape_percent(s: str):
@@ -709,6 +946,7 @@ def update_translations_for_source(source=None, translation_dict=None):
 	translation_records = frappe.db.get_values(
 		"Translation", {"source_text": source}, ["name", "language"], as_dict=1
 	)
+	obsolete = []
 	for d in translation_records:
 		if translation_dict.get(d.language, None):
 			doc = frappe.get_doc("Translation", d.name)
@@ -717,7 +955,17 @@ def update_translations_for_source(source=None, translation_dict=None):
 			# done with this lang value
 			translation_dict.pop(d.language)
 		else:
-			frappe.delete_doc("Translation", d.name)
+			obsolete.append(d)
+
+	# delete the translations of all removed languages at once
+	if obsolete:
+		frappe.has_permission("Translation", "delete", throw=True)
+		frappe.db.delete("Translation", {"name": ("in", [d.name for d in obsolete])})
+
+		from frappe.core.doctype.translation.translation import clear_user_translation_cache
+
+		for lang in {d.language for d in obsolete}:
+			clear_user_translation_cache(lang)
 
 	# remaining values are to be inserted
 	for lang, translated_text in translation_dict.items():
@@ -767,7 +1015,7 @@ def extract_messages_from_code(code):
 
 	messages = []
 
-	for m in TRANSLATE_PATTERN.finditer(code):
+	for m in iter_translate_calls(code):
 		message = m.group("message")
 		context = m.group("py_context") or m.group("js_context")
 		pos = m.start()
@@ -777,9 +1025,43 @@ def extract_messages_from_code(code):
 
 	return add_line_number(messages, code)
 
+
+def iter_translate_calls(code: str):
+	"""Yields matches of `TRANSLATE_PATTERN` in `code`, same as `finditer` would.
+
+	Candidate `_(` calls are located with a plain substring search first and the
+	pattern is only tried, anchored, at those positions. Files without any call
+	never reach the regex engine.
+	"""
+	find = code.find
+	match = TRANSLATE_PATTERN.match
+
+	pos = find("_(")
+	while pos != -1:
+		if m := match(code, pos):
+			yield m
+			pos = find("_(", m.end())
+		else:
+			pos = find("_(", pos + 2)
+
+
+def has_translation_calls(fileobj, markers: tuple[bytes, ...] = (b"_(", b"{% include")) -> bool:
+	"""Cheap check whether a file contains any of `markers`, so that extractors can skip
+	files without translation calls. `{% include` is matched since included files are
+	rendered before extraction. The file is rewound afterwards.
+	"""
+	fileobj.seek(0)
+	contents = fileobj.read()
+	fileobj.seek(0)
+
+	return any(marker in contents for marker in markers)
+
+
 def babel_extract_generic(fileobj, keywords, comment_tags, options):
 	try:
-		fileobj.seek(0)
+		if not has_translation_calls(fileobj):
+			return
+
 		file_contents = fileobj.read().decode('utf-8')
 	except Exception:
 		print(f"Could not scan file for translation")
@@ -788,11 +1070,15 @@ def babel_extract_generic(fileobj, keywords, comment_tags, options):
 	for lineno, funcname, messages, comments in extract_messages_from_code(file_contents):
 		yield lineno, funcname, messages, comments
 
-def babel_extract_python(*args, **kwargs):
+def babel_extract_python(fileobj, *args, **kwargs):
 	"""
 	Wrapper around babel's `extract_python`, handling our own implementation of `_()`
 	"""
-	for lineno, funcname, messages, comments in extract_python(*args, **kwargs):
+	# `_(` and `N_(` or `gettext(` and its variants, see `DEFAULT_KEYWORDS`
+	if not has_translation_calls(fileobj, (b"_(", b"gettext(")):
+		return
+
+	for lineno, funcname, messages, comments in extract_python(fileobj, *args, **kwargs):
 		if funcname == "_" and isinstance(messages, tuple) and len(messages) > 1:
 			funcname = "pgettext"
 			messages = (messages[-1], messages[0])  # (context, message)
@@ -803,6 +1089,10 @@ def babel_extract_python(*args, **kwargs):
 def babel_extract_javascript(fileobj, keywords, comment_tags, options):
 	from babel.messages.extract import extract_javascript
 
+	# skips tokenizing the file, `__(` calls also contain the generic `_(` marker
+	if not has_translation_calls(fileobj):
+		return
+
 	# We use `__` as our translation function
 	keywords = "__"
 
@@ -837,7 +1127,7 @@ def babel_extract_doctype_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -897,7 +1187,7 @@ def babel_extract_workspace_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -909,7 +1199,7 @@ def babel_extract_workspace_json(fileobj, *args, **kwargs):
 
 	content = data.get("content")
 	if (type(content) is str):
-		dict_content = json.loads(content)
+		dict_content = json_loads(content)
 		for line in dict_content:
 			ltyp = line.get('type')
 			if ltyp == 'header':
@@ -949,7 +1239,7 @@ def babel_extract_form_tour_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -991,7 +1281,7 @@ def babel_extract_module_onboarding_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -1027,7 +1317,7 @@ def babel_extract_onboarding_step_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -1049,7 +1339,7 @@ def babel_extract_web_form_json(fileobj, *args, **kwargs):
 	:param fileobj: the file-like object the messages should be extracted from
 	:rtype: `iterator`
 	"""
-	data = json.load(fileobj)
+	data = json_loads(fileobj.read())
 
 	if isinstance(data, list):
 		return
@@ -1076,33 +1366,112 @@ def babel_extract_web_form_json(fileobj, *args, **kwargs):
 def extract_messages_from_doctype(name):
 	"""Extract all translatable messages for a doctype. Includes labels, Python code,
 	Javascript code, html templates"""
-	messages = []
 	meta = frappe.get_meta(name)
+	messages = get_doctype_messages(
+		meta.name, meta.module, meta.description, meta.get("fields"), meta.get("permissions")
+	)
+
+	# workflow based on doctype
+	messages.extend(extract_messages_from_workflow(doctype=name))
+	return messages
+
+
+def extract_messages_from_doctypes(names: list[str]) -> list[tuple[str, str]]:
+	"""Same as `extract_messages_from_doctype` for many doctypes at once. Reads the
+	standard DocType, DocField and DocPerm records with a single query each, instead of
+	loading the meta of every doctype"""
+	if not names:
+		return []
+
+	doctype = DocType("DocType")
+	docfield = DocType("DocField")
+	docperm = DocType("DocPerm")
+
+	doctypes = (
+		frappe.qb.from_(doctype)
+		.select(doctype.name, doctype.module, doctype.description)
+		.where(doctype.name.isin(names))
+		.run(as_dict=True)
+	)
+
+	fields = defaultdict(list)
+	for d in (
+		frappe.qb.from_(docfield)
+		.select(
+			docfield.parent,
+			docfield.label,
+			docfield.description,
+			docfield.fieldtype,
+			docfield.options,
+		)
+		.where((docfield.parenttype == "DocType") & docfield.parent.isin(names))
+		.orderby(docfield.idx)
+		.run(as_dict=True)
+	):
+		fields[d.parent].append(d)
+
+	permissions = defaultdict(list)
+	for d in (
+		frappe.qb.from_(docperm)
+		.select(docperm.parent, docperm.role)
+		.where((docperm.parenttype == "DocType") & docperm.parent.isin(names))
+		.orderby(docperm.idx)
+		.run(as_dict=True)
+	):
+		permissions[d.parent].append(d)
+
+	messages = []
+	for d in doctypes:
+		messages.extend(
+			get_doctype_messages(
+				d.name, d.module, d.description, fields[d.name], permissions[d.name]
+			)
+		)
+
+	# workflows based on doctypes
+	messages.extend(
+		get_workflow_messages(
+			frappe.get_all("Workflow", filters={"document_type": ("in", names)}, pluck="name")
+		)
+	)
 
-	messages = [meta.name, meta.module]
+	return messages
+
+
+def get_doctype_messages(name, module, description, fields, permissions) -> list[tuple[str, str]]:
+	"""Translatable messages from a doctype's name, module, description, fields and roles"""
+	context = "DocType: " + name
+	return [
+		(context, message)
+		for message in _iter_doctype_messages(name, module, description, fields, permissions)
+		if message and is_translatable(message)
+	]
 
-	if meta.description:
-		messages.append(meta.description)
+
+def _iter_doctype_messages(name, module, description, fields, permissions):
+	yield name
+	yield module
+	yield description
 
 	# translations of field labels, description and options
-	for d in meta.get("fields"):
-		messages.extend([d.label, d.description])
+	for d in fields:
+		yield d.label
+		yield d.description
 
 		if d.fieldtype == "Select" and d.options:
-			options = d.options.split("\n")
-			if not "icon" in options[0]:
-				messages.extend(options)
+			# same filter as `babel_extract_doctype_json`
+			options = [
+				option for option in d.options.splitlines() if option and not option.isdigit()
+			]
+			if options and "icon" not in options[0]:
+				yield from options
 		if d.fieldtype == "HTML" and d.options:
-			messages.append(d.options)
+			yield d.options
 
 	# translations of roles
-	messages.extend(d.role for d in meta.get("permissions") if d.role)
-	messages = [message for message in messages if message]
-	messages = [("DocType: " + name, message) for message in messages if is_translatable(message)]
+	for d in permissions:
+		yield d.role
 
-	# workflow based on doctype
-	messages.extend(extract_messages_from_workflow(doctype=name))
-	return messages
 
 def get_extra_include_js_files(app_name=None):
 	"""Returns messages from js files included at time of boot like desk.min.js for desk and web"""
@@ -1119,137 +1488,230 @@ def get_extra_include_js_files(app_name=None):
 
 	return [(file, "frappe.translate.babel_extract_generic") for file in files]
 
+@functools.lru_cache(maxsize=None)
+def get_app_fixtures(app_name: str) -> tuple:
+	"""Returns the `fixtures` hook of an app. Memoized since `get_hooks` with an
+	`app_name` rebuilds the hooks of the app on every call"""
+	return tuple(frappe.get_hooks("fixtures", app_name=app_name) or ())
+
+
 def extract_messages_from_workflow(doctype=None, app_name=None):
 	assert doctype or app_name, "doctype or app_name should be provided"
 
 	# translations for Workflows
 	workflows = []
 	if doctype:
-		workflows = frappe.get_all("Workflow", filters={"document_type": doctype})
+		workflows = frappe.get_all("Workflow", filters={"document_type": doctype}, pluck="name")
 	else:
-		fixtures = frappe.get_hooks("fixtures", app_name=app_name) or []
+		fixtures = get_app_fixtures(app_name)
+		# filters of each Workflow fixture, `None` to export all workflows
+		fixture_filters = []
 		for fixture in fixtures:
-			if isinstance(fixture, str) and fixture == "Worflow":
-				workflows = frappe.get_all("Workflow")
+			if isinstance(fixture, str) and fixture == "Workflow":
+				fixture_filters = [None]
 				break
 			elif isinstance(fixture, dict) and fixture.get("dt", fixture.get("doctype")) == "Workflow":
-				workflows.extend(frappe.get_all("Workflow", filters=fixture.get("filters")))
+				fixture_filters.append(fixture.get("filters"))
+
+		if None in fixture_filters:
+			workflows = frappe.get_all("Workflow", pluck="name")
+		elif fixture_filters:
+			# a single query matching any of the fixtures
+			workflow = DocType("Workflow")
+			workflows = (
+				frappe.qb.from_(workflow)
+				.select(workflow.name)
+				.where(
+					Criterion.any(
+						workflow.name.isin(frappe.qb.get_query("Workflow", filters=filters))
+						for filters in fixture_filters
+					)
+				)
+				.run(pluck=True)
+			)
 
-	messages = []
-	document_state = DocType("Workflow Document State")
-	for w in workflows:
-		states = frappe.db.get_values(
-			document_state,
-			filters=document_state.parent == w["name"],
-			fieldname="state",
-			distinct=True,
-			as_dict=True,
-			order_by=None,
-		)
-		messages.extend(
-			[
-				("Workflow: " + w["name"], state["state"])
-				for state in states
-				if is_translatable(state["state"])
-			]
-		)
-		states = frappe.db.get_values(
-			document_state,
-			filters=(document_state.parent == w["name"]) & (document_state.message.isnotnull()),
-			fieldname="message",
-			distinct=True,
-			order_by=None,
-			as_dict=True,
-		)
-		messages.extend(
-			[
-				("Workflow: " + w["name"], state["message"])
-				for state in states
-				if is_translatable(state["message"])
-			]
-		)
+	return get_workflow_messages(workflows)
 
-		actions = frappe.db.get_values(
-			"Workflow Transition",
-			filters={"parent": w["name"]},
-			fieldname="action",
-			as_dict=True,
-			distinct=True,
-			order_by=None,
-		)
 
+def get_workflow_messages(names: list[str]) -> list[tuple[str, str]]:
+	"""Translatable states, messages and actions of the given workflows, read with
+	a single query per child table for all workflows"""
+	if not names:
+		return []
+
+	document_state = DocType("Workflow Document State")
+	transition = DocType("Workflow Transition")
+
+	# states and their messages come from the same rows, keep them in separate
+	# ordered sets so that all states of a workflow still precede its messages
+	states = defaultdict(dict)
+	state_messages = defaultdict(dict)
+	for parent, state, message in (
+		frappe.qb.from_(document_state)
+		.select(document_state.parent, document_state.state, document_state.message)
+		.where(document_state.parent.isin(names))
+		.distinct()
+		.run()
+	):
+		states[parent][state] = None
+		if message is not None:
+			state_messages[parent][message] = None
+
+	actions = defaultdict(list)
+	for parent, action in (
+		frappe.qb.from_(transition)
+		.select(transition.parent, transition.action)
+		.where(transition.parent.isin(names))
+		.distinct()
+		.run()
+	):
+		actions[parent].append(action)
+
+	messages = []
+	for name in names:
+		context = f"Workflow: {name}"
 		messages.extend(
-			[
-				("Workflow: " + w["name"], action["action"])
-				for action in actions
-				if is_translatable(action["action"])
-			]
+			(context, message)
+			for message in (*states[name], *state_messages[name], *actions[name])
+			if is_translatable(message)
 		)
 
 	return messages
 
+
 def extract_messages_from_custom_fields(app_name):
-	fixtures = frappe.get_hooks("fixtures", app_name=app_name) or []
-	custom_fields = []
+	fixtures = get_app_fixtures(app_name)
+	# filters of each Custom Field fixture, `None` to export all custom fields
+	fixture_filters = []
 
 	for fixture in fixtures:
+		if isinstance(fixture, str) and fixture == "Custom Field":
+			fixture_filters = [None]
+			break
+		elif (
+			isinstance(fixture, dict)
+			and fixture.get("dt", fixture.get("doctype")) == "Custom Field"
+		):
+			fixture_filters.append(fixture.get("filters"))
+
+	messages = []
+	for filters in fixture_filters:
 		try:
-			if isinstance(fixture, str) and fixture == "Custom Field":
-				custom_fields = frappe.get_all(
-					"Custom Field", fields=["name", "label", "description", "fieldtype", "options"]
-				)
-				break
-			elif isinstance(fixture, dict) and fixture.get("dt", fixture.get("doctype")) == "Custom Field":
-				custom_fields.extend(
-					frappe.get_all(
-						"Custom Field",
-						filters=fixture.get("filters"),
-						fields=["name", "label", "description", "fieldtype", "options"],
-					)
-				)
+			messages.extend(get_custom_field_messages(filters))
 		except Exception:
 			continue
+	return messages
+
+
+def get_custom_field_messages(filters=None) -> list[tuple[str, str]]:
+	"""Translatable labels, descriptions and select options of the matching custom fields.
+
+	Only fields that have any of them set are read, and options only of Select fields."""
+	if isinstance(filters, dict):
+		filters = [make_filter_tuple("Custom Field", key, value) for key, value in filters.items()]
+	filters = list(filters or [])
 
 	messages = []
-	for cf in custom_fields:
-		for prop in ("label", "description"):
-			if not cf.get(prop) or not is_translatable(cf[prop]):
-				continue
-			messages.append(("Custom Field - {}: {}".format(prop, cf["name"]), cf[prop]))
-		if cf["fieldtype"] == "Selection" and cf.get("options"):
-			messages.extend(
-				("Custom Field - Description: " + cf["name"], option)
-				for option in cf["options"].split("\n")
-				if option and "icon" not in option and is_translatable(option)
-			)
+	messages.extend(
+		("Custom Field - {}: {}".format(prop, cf["name"]), cf[prop])
+		for cf in frappe.get_all(
+			"Custom Field",
+			filters=filters,
+			or_filters={"label": ("is", "set"), "description": ("is", "set")},
+			fields=["name", "label", "description"],
+		)
+		for prop in ("label", "description")
+		if cf[prop] and is_translatable(cf[prop])
+	)
+
+	for cf in frappe.get_all(
+		"Custom Field",
+		filters=[*filters, ["fieldtype", "=", "Select"], ["options", "is", "set"]],
+		fields=["name", "options"],
+	):
+		messages.extend(
+			("Custom Field - options: " + cf["name"], option)
+			for option in cf["options"].splitlines()
+			if option and "icon" not in option and is_translatable(option)
+		)
 	return messages
 
+
 def extract_messages_from_report(name):
 	"""Returns all translatable strings from a :class:`frappe.core.doctype.Report`"""
 	report = frappe.get_doc("Report", name)
-	messages = []
+	return get_report_messages(
+		report.name, report.report_name, report.query, report.columns, report.filters
+	)
 
-	if report.columns:
-		context = (
-			"Column of report '%s'" % report.name
-		)  # context has to match context in `prepare_columns` in query_report.js
-		messages.extend([(None, report_column.label, context) for report_column in report.columns])
 
-	if report.filters:
-		messages.extend([(None, report_filter.label) for report_filter in report.filters])
+def extract_messages_from_reports(names: list[str]) -> list[tuple]:
+	"""Names and translatable strings of many reports. Reads the Report, Report Column
+	and Report Filter records with a single query each, instead of loading every report"""
+	if not names:
+		return []
+
+	report = DocType("Report")
+	report_column = DocType("Report Column")
+	report_filter = DocType("Report Filter")
+
+	reports = (
+		frappe.qb.from_(report)
+		.select(report.name, report.report_name, report.query)
+		.where(report.name.isin(names))
+		.run(as_dict=True)
+	)
 
-	if report.query:
+	columns = defaultdict(list)
+	for d in (
+		frappe.qb.from_(report_column)
+		.select(report_column.parent, report_column.label)
+		.where((report_column.parenttype == "Report") & report_column.parent.isin(names))
+		.orderby(report_column.idx)
+		.run(as_dict=True)
+	):
+		columns[d.parent].append(d)
+
+	filters = defaultdict(list)
+	for d in (
+		frappe.qb.from_(report_filter)
+		.select(report_filter.parent, report_filter.label)
+		.where((report_filter.parenttype == "Report") & report_filter.parent.isin(names))
+		.orderby(report_filter.idx)
+		.run(as_dict=True)
+	):
+		filters[d.parent].append(d)
+
+	messages = []
+	for d in reports:
+		messages.append((None, d.name))
 		messages.extend(
-			[
+			get_report_messages(d.name, d.report_name, d.query, columns[d.name], filters[d.name])
+		)
+
+	return messages
+
+
+def get_report_messages(name, report_name, query, columns, filters) -> list[tuple]:
+	"""Translatable strings from a report's columns, filters, query and name"""
+	# context has to match context in `prepare_columns` in query_report.js
+	context = "Column of report '%s'" % name
+
+	messages = list(
+		chain(
+			((None, report_column.label, context) for report_column in columns or ()),
+			((None, report_filter.label) for report_filter in filters or ()),
+			(
 				(None, message)
-				for message in REPORT_TRANSLATE_PATTERN.findall(report.query)
+				for message in (REPORT_TRANSLATE_PATTERN.findall(query) if query else ())
 				if is_translatable(message)
-			]
+			),
 		)
-
-	messages.append((None, report.report_name))
+	)
+	messages.append((None, report_name))
 	return messages
 
+
 @frappe.whitelist()
 def get_source_additional_info(source, language=""):
 	from frappe.frappeclient import FrappeClient
@@ -1259,49 +1721,83 @@ def get_source_additional_info(source, language=""):
 
 
 @frappe.whitelist()
-def get_contributions(language):
+def get_contributions(language, start=0, page_length=500):
 	return frappe.get_all(
 		"Translation",
-		fields=["*"],
+		fields=[
+			"name",
+			"language",
+			"source_text",
+			"translated_text",
+			"context",
+			"contribution_docname",
+			"contribution_status",
+		],
 		filters={
 			"contributed": 1,
 		},
+		limit_start=start,
+		limit_page_length=page_length,
 	)
 
 
 @frappe.whitelist()
 def get_contribution_status(message_id):
+	return get_contribution_statuses([message_id])[message_id]
+
+
+@frappe.whitelist()
+def get_contribution_statuses(message_ids):
+	"""Returns the contribution status of many translations keyed by translation name.
+	Reads the translations with a single query and queries the translator over one session"""
 	from frappe.frappeclient import FrappeClient
 
-	doc = frappe.get_doc("Translation", message_id)
-	translator = FrappeClient(get_translator_url())
-	return translator.get_api(
-		"translator.api.get_contribution_status",
-		params={"translation_id": doc.contribution_docname},
+	message_ids = frappe.parse_json(message_ids)
+	contributions = dict(
+		frappe.get_all(
+			"Translation",
+			filters={"name": ("in", message_ids)},
+			fields=["name", "contribution_docname"],
+			as_list=True,
+		)
 	)
+	for message_id in message_ids:
+		if message_id not in contributions:
+			frappe.throw(
+				frappe._("Translation {0} not found").format(message_id), frappe.DoesNotExistError
+			)
+
+	translator = FrappeClient(get_translator_url())
+	return {
+		message_id: translator.get_api(
+			"translator.api.get_contribution_status",
+			params={"translation_id": contribution_docname},
+		)
+		for message_id, contribution_docname in contributions.items()
+	}
 
 
+# hooks only change on app install, `frappe.clear_cache` clears this
+@site_cache()
 def get_translator_url():
-	return frappe.get_hooks()["translator_url"][0]
+	return frappe.get_hooks("translator_url")[0]
 
 
 @frappe.whitelist(allow_guest=True)
 def get_all_languages(with_language_name: bool = False) -> list:
 	"""Returns all enabled language codes ar, ch etc"""
 
-	def get_language_codes():
-		return frappe.get_all("Language", filters={"enabled": 1}, pluck="name")
-
 	def get_all_language_with_name():
 		return frappe.get_all("Language", ["language_code", "language_name"], {"enabled": 1})
 
 	if not frappe.db:
 		frappe.connect()
 
+	# both variants are served from one cached query, `language_code` is the name
+	languages = frappe.cache.get_value("languages_with_name", get_all_language_with_name)
 	if with_language_name:
-		return frappe.cache.get_value("languages_with_name", get_all_language_with_name)
-	else:
-		return frappe.cache.get_value("languages", get_language_codes)
+		return languages
+	return [language.language_code for language in languages]
 
 
 def get_preferred_language_cookie():
@@ -1309,11 +1805,16 @@ def get_preferred_language_cookie():
 
 
 def get_translated_doctypes():
-	dts = frappe.get_all("DocType", {"translated_doctype": 1}, pluck="name")
-	custom_dts = frappe.get_all(
-		"Property Setter", {"property": "translated_doctype", "value": "1"}, pluck="doc_type"
-	)
-	return unique(dts + custom_dts)
+	def _get_translated_doctypes():
+		dts = frappe.get_all("DocType", {"translated_doctype": 1}, pluck="name")
+		custom_dts = frappe.get_all(
+			"Property Setter", {"property": "translated_doctype", "value": "1"}, pluck="doc_type"
+		)
+		# ordered union without building the concatenated list first
+		return list(dict.fromkeys(chain(dts, custom_dts)))
+
+	# cleared along with the doctype cache, see `frappe.cache_manager`
+	return frappe.cache.get_value("translated_doctypes", _get_translated_doctypes)
 
 
 @contextmanager
@@ -1336,15 +1837,20 @@ def print_language(language: str):
 	_lang = frappe.local.lang
 	_jenv = frappe.local.jenv
 
-	# set language, empty any existing lang_full_dict and jenv
+	# set language, jinja globals are set up per language so reuse the environment
+	# built by an earlier print in the same language instead of building a new one
 	frappe.local.lang = language
-	frappe.local.jenv = None
+	frappe.local.jenv = frappe.local.jenv_by_lang.get(language)
 
-	yield
+	try:
+		yield
+	finally:
+		if frappe.local.jenv:
+			frappe.local.jenv_by_lang[language] = frappe.local.jenv
 
-	# restore original values
-	frappe.local.lang = _lang
-	frappe.local.jenv = _jenv
+		# restore original values
+		frappe.local.lang = _lang
+		frappe.local.jenv = _jenv
 
 
 # Backward compatibility